@@ -1,56 +1,94 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, UploadFile, File
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-import json
+import orjson
 import asyncio
-import base64
 import logging
-from typing import Dict, List
+import queue
+import re
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pybase64 import b64decode
+from typing import Dict, List, Union
 from datetime import datetime
-from models.personas import PersonaManager, ChatMessage
-from services.websocket_manager import ConnectionManager
+from models.personas import PersonaManager
+from services.websocket_manager import ConnectionManager, AUDIO_FRAME, AUDIO_FRAME_PREFIX
+from services.audio_batcher import AudioBatcher
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; records are queued and written by a background thread
+# so stream I/O never blocks the event loop
+log_queue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+log_listener.start()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI Persona Chat API", version="1.0.0")
+app = FastAPI(title="AI Persona Chat API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Templates and static files
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Upstream audio coalescing; AUDIO_BATCH_MS=0 forwards every chunk immediately
+AUDIO_BATCH_DELAY = float(os.getenv("AUDIO_BATCH_MS", "10")) / 1000
+AUDIO_BATCH_BYTES = int(os.getenv("AUDIO_BATCH_BYTES", "32768"))
+
 # Initialize managers
 persona_manager = PersonaManager()
 connection_manager = ConnectionManager()
 
+# Personas are static, so the voice page is rendered once at startup
+voice_page_html = templates.get_template("voice_chat_audioworklet.html").render(
+    personas=persona_manager.get_all_personas()
+)
+
+@app.on_event("startup")
+async def log_event_loop():
+    """Log which event loop implementation the server is running on"""
+    logger.info(f"Event loop policy: {type(asyncio.get_event_loop_policy()).__name__}")
+
+@app.on_event("startup")
+async def warm_openai_pool():
+    """Pre-connect OpenAI realtime clients so the first conversation skips the handshake"""
+    try:
+        await persona_manager.warmup()
+    except Exception as e:
+        # The pool still grows on demand, so a cold start is not fatal
+        logger.warning(f"Could not pre-connect OpenAI clients: {e}")
+
+@app.on_event("shutdown")
+async def close_openai_pool():
+    """Close pooled OpenAI realtime connections"""
+    await persona_manager.close()
+
+@app.on_event("shutdown")
+def stop_log_listener():
+    """Flush queued log records before the process exits"""
+    log_listener.stop()
+
 @app.get("/", response_class=HTMLResponse)
-async def get_voice_page(request: Request):
+async def get_voice_page():
     """Serve the main voice interface page"""
-    personas = persona_manager.get_all_personas()
-    return templates.TemplateResponse("voice_chat_audioworklet.html", {
-        "request": request,
-        "personas": personas
-    })
+    return HTMLResponse(voice_page_html)
 
 @app.get("/api/personas")
 async def get_personas():
     """Get all available personas"""
-    return {"personas": persona_manager.get_all_personas()}
+    return Response(persona_manager.get_all_personas_json(), media_type="application/json")
 
 @app.get("/api/personas/{persona_id}")
 async def get_persona(persona_id: str):
     """Get a specific persona by ID"""
-    persona = persona_manager.get_persona(persona_id)
-    if not persona:
-        return {"error": "Persona not found"}, 404
-    return {"persona": persona}
+    persona_json = persona_manager.get_persona_json(persona_id)
+    if persona_json is None:
+        return ORJSONResponse({"error": "Persona not found"}, status_code=404)
+    return Response(persona_json, media_type="application/json")
 
 @app.get("/api/stats")
 async def get_stats():
@@ -61,10 +99,57 @@ async def get_stats():
         "available_personas": len(persona_manager.get_all_personas())
     }
 
-@app.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    """WebSocket endpoint for real-time voice chat with OpenAI Realtime API"""
-    await connection_manager.connect(websocket, client_id)
+async def receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """Receive the raw payload of the next text or binary WebSocket frame"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    text = message.get("text")
+    return text if text is not None else message["bytes"]
+
+# Constant OpenAI events, serialized once at import
+COMMIT_AUDIO_EVENT = orjson.dumps({"type": "input_audio_buffer.commit"}).decode()
+RESPONSE_CREATE_AUDIO_EVENT = orjson.dumps({
+    "type": "response.create",
+    "response": {
+        "modalities": ["audio"],
+        "instructions": "Respond to what the user just said in a natural, conversational way."
+    }
+}).decode()
+DISABLE_TURN_DETECTION_EVENT = orjson.dumps({
+    "type": "session.update",
+    "session": {"turn_detection": None}
+}).decode()
+
+# Fixed client error frames, serialized once at import
+ERR_NO_PERSONA = orjson.dumps({
+    "type": "error",
+    "message": "Please select a persona first."
+}).decode()
+ERR_NOT_CONNECTED = orjson.dumps({
+    "type": "error",
+    "message": "Voice service not connected. Please try again."
+}).decode()
+
+async def handle_select_persona(client_id: str, message_data: Dict):
+    """Set the persona for this client"""
+    persona_id = message_data["persona_id"]
+    persona = persona_manager.get_persona(persona_id)
+    connection_manager.set_client_persona(client_id, persona_id)
+
+    # Send confirmation
+    await connection_manager.send_message(client_id, {
+        "type": "persona_selected",
+        "persona": persona,
+        "message": f"Voice chat with {persona['name']} is ready!"
+    })
+
+async def handle_start_conversation(client_id: str, message_data: Dict):
+    """Start continuous conversation mode"""
+    persona_id = connection_manager.get_client_persona(client_id)
+    if not persona_id:
+        await connection_manager.send_raw(client_id, ERR_NO_PERSONA)
+        return
 
     # Setup response handlers for this client (audio only)
     response_handlers = {
@@ -73,140 +158,190 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     }
 
     try:
-        while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+        logger.info(f"Starting conversation for client {client_id} with persona {persona_id}")
 
-            # Process the message
-            if message_data["type"] == "select_persona":
-                # Set persona for this client
-                persona_id = message_data["persona_id"]
-                persona = persona_manager.get_persona(persona_id)
-                connection_manager.set_client_persona(client_id, persona_id)
-
-                # Send confirmation
-                await connection_manager.send_message(client_id, {
-                    "type": "persona_selected",
-                    "persona": persona,
-                    "message": f"Voice chat with {persona['name']} is ready!"
-                })
-
-            elif message_data["type"] == "start_conversation":
-                # Start continuous conversation mode
-                persona_id = connection_manager.get_client_persona(client_id)
-                if not persona_id:
-                    await connection_manager.send_message(client_id, {
-                        "type": "error",
-                        "message": "Please select a persona first."
-                    })
-                    continue
+        # Initialize conversation with persona
+        result = await persona_manager.start_conversation(
+            persona_id, client_id, response_handlers
+        )
+
+        logger.info(f"Conversation started result: {result}")
+
+        await connection_manager.send_message(client_id, {
+            "type": "conversation_started",
+            "message": "Conversation started - speak naturally!"
+        })
 
-                try:
-                    logger.info(f"Starting conversation for client {client_id} with persona {persona_id}")
+    except Exception as e:
+        logger.error(f"Error starting conversation: {e}")
+        await connection_manager.send_message(client_id, {
+            "type": "error",
+            "message": f"Error starting conversation: {str(e)}"
+        })
+
+async def handle_audio_stream_data(client_id: str, message_data: Dict):
+    """Handle a legacy base64-in-JSON audio chunk"""
+    await forward_audio(client_id, b64decode(message_data["audio_data"]))
 
-                    # Initialize conversation with persona
-                    result = await persona_manager.start_conversation(
-                        persona_id, client_id, response_handlers
-                    )
+async def handle_commit_audio_input(client_id: str, message_data: Dict):
+    """Manual speech completion - commit audio buffer and trigger response"""
+    openai_client = persona_manager.get_openai_client(client_id)
+    if openai_client:
+        try:
+            logger.info(f"Committing audio input for manual speech from client {client_id}")
+            batcher = connection_manager.get_audio_batcher(client_id)
+            if batcher:
+                await batcher.flush()
+                await batcher.drain()
+            await openai_client.send_raw_event(COMMIT_AUDIO_EVENT)
+            await openai_client.send_raw_event(RESPONSE_CREATE_AUDIO_EVENT)
+        except Exception as e:
+            logger.error(f"Error committing audio input: {e}")
+            await connection_manager.send_message(client_id, {
+                "type": "error",
+                "message": f"Error processing speech: {str(e)}"
+            })
 
-                    logger.info(f"Conversation started result: {result}")
+async def handle_end_conversation(client_id: str, message_data: Dict):
+    """End continuous conversation"""
+    openai_client = persona_manager.get_openai_client(client_id)
+    if openai_client:
+        try:
+            await openai_client.send_raw_event(DISABLE_TURN_DETECTION_EVENT)
+            await connection_manager.send_message(client_id, {
+                "type": "conversation_ended",
+                "message": "Conversation ended"
+            })
+        except Exception as e:
+            logger.error(f"Error ending conversation: {e}")
+
+# Legacy audio frames as serialized by the browser's JSON.stringify
+LEGACY_AUDIO_PREFIX = '{"type":"audio_stream_data"'
+LEGACY_AUDIO_DATA = re.compile(r'"audio_data":"([A-Za-z0-9+/=]*)"')
+
+# Client message type -> handler(client_id, message_data)
+MESSAGE_HANDLERS = {
+    "audio_stream_data": handle_audio_stream_data,
+    "select_persona": handle_select_persona,
+    "start_conversation": handle_start_conversation,
+    "commit_audio_input": handle_commit_audio_input,
+    "end_conversation": handle_end_conversation
+}
+
+@app.websocket("/ws/{client_id}")
+async def websocket_endpoint(websocket: WebSocket, client_id: str):
+    """WebSocket endpoint for real-time voice chat with OpenAI Realtime API"""
+    await connection_manager.connect(websocket, client_id)
+    # Kept locally too: a failed send can drop it from the manager before teardown
+    batcher = AudioBatcher(
+        lambda audio_data: upload_audio(client_id, audio_data),
+        flush_delay=AUDIO_BATCH_DELAY,
+        max_batch_bytes=AUDIO_BATCH_BYTES
+    )
+    connection_manager.set_audio_batcher(client_id, batcher)
 
-                    await connection_manager.send_message(client_id, {
-                        "type": "conversation_started",
-                        "message": "Conversation started - speak naturally!"
-                    })
+    try:
+        while True:
+            # Receive message from client
+            data = await receive_frame(websocket)
 
-                except Exception as e:
-                    logger.error(f"Error starting conversation: {e}")
-                    await connection_manager.send_message(client_id, {
-                        "type": "error",
-                        "message": f"Error starting conversation: {str(e)}"
-                    })
+            if isinstance(data, bytes):
+                # Binary frames carry raw PCM16 audio behind a one-byte opcode
+                if data and data[0] == AUDIO_FRAME:
+                    await forward_audio(client_id, memoryview(data)[1:])
+                continue
 
-            elif message_data["type"] == "audio_stream_data":
-                # Handle continuous streaming audio data
-                persona_id = connection_manager.get_client_persona(client_id)
-                if not persona_id:
+            if data.startswith(LEGACY_AUDIO_PREFIX):
+                # Fast path for legacy JSON audio: pull out the base64 without a full parse
+                match = LEGACY_AUDIO_DATA.search(data)
+                if match:
+                    await forward_audio(client_id, b64decode(match.group(1)))
                     continue
 
-                try:
-                    if persona_manager.openai_client and persona_manager.openai_client.is_connected:
-                        audio_data = base64.b64decode(message_data["audio_data"])
-                        logger.debug(f"Received audio chunk: {len(audio_data)} bytes from client {client_id}")
-                        await persona_manager.openai_client.append_audio_data(audio_data)
-
-                        # Send audio data to OpenAI for processing
-                        logger.debug(f"Sent {len(audio_data)} bytes to OpenAI")
-                    else:
-                        logger.warning("OpenAI client not connected when trying to send audio")
-                        await connection_manager.send_message(client_id, {
-                            "type": "error",
-                            "message": "Voice service not connected. Please try again."
-                        })
-
-                except Exception as e:
-                    logger.error(f"Error processing audio stream: {e}")
-                    await connection_manager.send_message(client_id, {
-                        "type": "error",
-                        "message": f"Audio processing error: {str(e)}"
-                    })
-
-            elif message_data["type"] == "commit_audio_input":
-                # Manual speech completion - commit audio buffer and trigger response
-                if persona_manager.openai_client:
-                    try:
-                        logger.info(f"Committing audio input for manual speech from client {client_id}")
-                        await persona_manager.openai_client.send_event("input_audio_buffer.commit")
-                        await persona_manager.openai_client.send_event("response.create", {
-                            "response": {
-                                "modalities": ["audio"],
-                                "instructions": "Respond to what the user just said in a natural, conversational way."
-                            }
-                        })
-                    except Exception as e:
-                        logger.error(f"Error committing audio input: {e}")
-                        await connection_manager.send_message(client_id, {
-                            "type": "error",
-                            "message": f"Error processing speech: {str(e)}"
-                        })
-
-            elif message_data["type"] == "end_conversation":
-                # End continuous conversation
-                if persona_manager.openai_client:
-                    try:
-                        await persona_manager.openai_client.send_event("session.update", {
-                            "session": {"turn_detection": None}
-                        })
-                        await connection_manager.send_message(client_id, {
-                            "type": "conversation_ended",
-                            "message": "Conversation ended"
-                        })
-                    except Exception as e:
-                        logger.error(f"Error ending conversation: {e}")
+            message_data = orjson.loads(data)
+
+            # Process the message
+            handler = MESSAGE_HANDLERS.get(message_data["type"])
+            if handler:
+                await handler(client_id, message_data)
 
     except WebSocketDisconnect:
-        await persona_manager.cleanup_client_handlers(client_id)
-        connection_manager.disconnect(client_id)
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        await persona_manager.cleanup_client_handlers(client_id)
-        connection_manager.disconnect(client_id)
+    finally:
+        # Shielded so a cancelled connection task still releases its state
+        await asyncio.shield(release_client(client_id, batcher))
 
 # Text handlers removed - voice-only application
 
+# [epoch second, ISO string] of the last timestamp handed out
+_timestamp_cache = [0, ""]
+
+def current_timestamp() -> str:
+    """Get an ISO timestamp at second granularity, formatted once per second"""
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.fromtimestamp(now).isoformat()
+    return _timestamp_cache[1]
+
+async def forward_audio(client_id: str, audio_data: Union[bytes, memoryview]):
+    """Queue a chunk of client audio for the OpenAI input buffer"""
+    persona_id = connection_manager.get_client_persona(client_id)
+    if not persona_id:
+        return
+
+    # Small chunks are coalesced and uploaded together by the client's batcher
+    batcher = connection_manager.get_audio_batcher(client_id)
+    if batcher:
+        await batcher.append(audio_data)
+
+async def release_client(client_id: str, batcher: AudioBatcher):
+    """Tear down all per-client state once its socket is gone"""
+    # Order matters: no upload may still be using the OpenAI lease when it is
+    # released and recycled, and disconnect drops the remaining state last.
+    # The departed client's uploads are cancelled; nobody is left to hear the reply
+    await batcher.abort()
+    await persona_manager.cleanup_client_handlers(client_id)
+    connection_manager.disconnect(client_id)
+
+async def upload_audio(client_id: str, audio_data: bytes):
+    """Append a batch of client audio to the OpenAI input buffer"""
+    openai_client = persona_manager.get_openai_client(client_id)
+    try:
+        if openai_client is not None and openai_client.is_connected:
+            await openai_client.append_audio_data(audio_data)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Sent %d bytes of audio from client %s to OpenAI", len(audio_data), client_id)
+        else:
+            logger.warning("OpenAI client not connected when trying to send audio")
+            await connection_manager.send_raw(client_id, ERR_NOT_CONNECTED)
+
+    except Exception as e:
+        logger.error(f"Error processing audio stream: {e}")
+        await connection_manager.send_message(client_id, {
+            "type": "error",
+            "message": f"Audio processing error: {str(e)}"
+        })
+
+def audio_delta_frame(event: Dict) -> bytes:
+    """Get the binary client frame for an audio delta event, built once per event"""
+    frame = event.get("_client_frame")
+    if frame is None:
+        # Raw PCM16 behind the audio opcode: no base64 on the wire or in the browser
+        frame = AUDIO_FRAME_PREFIX + b64decode(event["delta"])
+        # Every listening client receives the same event, so reuse the frame
+        event["_client_frame"] = frame
+    return frame
+
 async def handle_audio_delta(client_id: str, event: Dict):
     """Handle streaming audio response from OpenAI"""
-    logger.info(f"Handling audio delta for client {client_id}")
     audio_delta = event.get("delta")
     if audio_delta:
-        logger.info(f"Sending audio delta to client: {len(audio_delta)} chars")
-        # Send base64 encoded audio chunk
-        await connection_manager.send_message(client_id, {
-            "type": "audio_delta",
-            "audio_data": audio_delta,
-            "timestamp": datetime.now().isoformat()
-        })
+        logger.debug("Sending audio delta to client %s: %d chars", client_id, len(audio_delta))
+        await connection_manager.send_raw(client_id, audio_delta_frame(event))
     else:
         logger.warning("No audio delta in event")
 
@@ -214,9 +349,22 @@ async def handle_audio_done(client_id: str, event: Dict):
     """Handle completed audio response from OpenAI"""
     await connection_manager.send_message(client_id, {
         "type": "audio_response_complete",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": current_timestamp()
     })
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop/httptools ship with uvicorn[standard]; frame limits sized for ~1s PCM16 audio chunks
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        ws_max_size=65536,
+        ws_max_queue=8,  # Few buffered inbound frames, so a flooding client is backpressured
+        ws_ping_interval=20,
+        ws_ping_timeout=20,
+        backlog=2048
+    )
\ No newline at end of file
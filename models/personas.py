@@ -1,29 +1,118 @@
-from pydantic import BaseModel
-from typing import Dict, List, Optional
-from datetime import datetime
-import asyncio
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+from types import MappingProxyType
+import itertools
 import logging
-from services.openai_realtime import OpenAIRealtimeClient
+import os
+import re
+import orjson
+from services.openai_realtime import OpenAIRealtimeClient, RealtimeClientPool
 
 logger = logging.getLogger(__name__)
 
-class ChatMessage(BaseModel):
-    message: str
-    timestamp: datetime
-    sender: str  # "user" or "ai"
-
-class Persona(BaseModel):
+# Opening line each persona speaks when a conversation starts
+GREETINGS: Mapping[str, str] = MappingProxyType({
+    "astrologer": "Hello, beautiful soul! The stars have guided you here today. I sense positive energy around you. What would you like to explore about your cosmic journey?",
+    "health": "Hi there! I'm so excited to help you on your wellness journey today. Whether it's nutrition, fitness, or healthy habits, I'm here to support you. What health goals are you working on?",
+    "emotional": "Hello, dear friend. I'm really glad you're here. This is a safe space where you can share whatever is on your heart. How are you feeling today?",
+    "windows": "Good day! Thanks for considering us for your window needs. I'm here to help you find the perfect windows that combine beauty, efficiency, and value. What type of project are you working on?",
+    "cars": "Hey there! Great to meet you! I'm pumped to help you find the perfect vehicle. Whether you're looking for reliability, performance, or style, we'll find something amazing together. What kind of driving do you do most?",
+    "general": "Hello! It's great to connect with you today. I'm here for whatever you'd like to discuss - business ideas, casual conversation, or brainstorming. What's on your mind?"
+})
+DEFAULT_GREETING = "Hello! How can I help you today?"
+
+# Realtime API voice for personas that do not pick one
+DEFAULT_VOICE = "alloy"
+
+# Appended to every persona prompt for continuous voice conversations
+VOICE_CONVERSATION_GUIDANCE = "\n\nIMPORTANT: You are having a natural voice conversation. Respond conversationally and authentically. Keep responses engaging but concise (1-2 sentences). Always acknowledge what the user says and continue the conversation naturally."
+
+# Persona-independent part of the continuous conversation session
+_BASE_SESSION = {
+    "modalities": ["text", "audio"],
+    "input_audio_format": "pcm16",
+    "output_audio_format": "pcm16",
+    "input_audio_transcription": {"model": "whisper-1"},
+    "turn_detection": {
+        "type": "server_vad",
+        "threshold": 0.6,  # Less sensitive - wait for clearer speech ending
+        "prefix_padding_ms": 400,  # More padding to catch full speech
+        "silence_duration_ms": 1200  # Wait longer for natural pauses
+    },
+    "temperature": 0.85,  # Natural but consistent responses
+    "max_response_output_tokens": 150,  # Allow slightly longer responses
+    "tool_choice": "none"  # Disable tool calling for faster responses
+}
+
+# Overrides applied to the client's session_config for one-shot audio input
+_AUDIO_INPUT_SESSION = {
+    "modalities": ["audio", "text"],  # Must include both audio and text
+    "voice": "alloy",
+    "input_audio_transcription": {"model": "whisper-1"},
+    "turn_detection": {
+        "type": "server_vad",
+        "threshold": 0.5,
+        "prefix_padding_ms": 300,
+        "silence_duration_ms": 500
+    }
+}
+
+# Pre-encoded event that empties the input audio buffer
+CLEAR_AUDIO_BUFFER_EVENT = orjson.dumps({"type": "input_audio_buffer.clear"}).decode()
+
+# response.create payload that voices the greeting
+GREETING_RESPONSE = {
+    "response": {
+        "modalities": ["audio"],
+        "instructions": "Speak this greeting message naturally with the persona's characteristic voice and tone. Be warm and engaging."
+    }
+}
+
+# Keywords that steer the offline fallback responses
+_ASTROLOGY_WORDS = frozenset({"horoscope", "zodiac", "sign", "stars"})
+_DESTINY_WORDS = frozenset({"future", "prediction", "destiny"})
+_NUTRITION_WORDS = frozenset({"diet", "food", "eat", "nutrition"})
+_FITNESS_WORDS = frozenset({"exercise", "workout", "fitness", "gym"})
+_STRESS_WORDS = frozenset({"stressed", "anxious", "worried", "overwhelmed"})
+_SADNESS_WORDS = frozenset({"sad", "down", "depressed", "hurt"})
+_ALUMINUM_WORDS = frozenset({"aluminum", "aluminium", "metal"})
+_WOOD_WORDS = frozenset({"wood", "wooden", "timber"})
+_FAMILY_CAR_WORDS = frozenset({"suv", "family", "kids", "space"})
+_SEDAN_WORDS = frozenset({"sedan", "car", "fuel", "economy"})
+_BUSINESS_WORDS = frozenset({"business", "work", "professional", "career"})
+_IDEA_WORDS = frozenset({"idea", "brainstorm", "creative", "innovation"})
+
+_WORD_PATTERN = re.compile(r"[a-z]+")
+
+def _words(message: str) -> set:
+    """Split a message into its set of lower-case words"""
+    return set(_WORD_PATTERN.findall(message.lower()))
+
+@dataclass(slots=True, frozen=True)
+class Persona:
     id: str
     name: str
     description: str
     prompt: str
     color: str
     icon: str
+    voice: str = DEFAULT_VOICE
 
 class PersonaManager:
     def __init__(self):
-        self.openai_client = None
-        self.current_response_handlers = {}
+        # Each conversation leases its own connection so sessions never share state
+        self.client_pool = RealtimeClientPool(
+            size=int(os.getenv("REALTIME_POOL_SIZE", "4")),
+            on_client_created=self._setup_event_handlers
+        )
+        # client_id -> leased connection
+        self.client_sessions: Dict[str, OpenAIRealtimeClient] = {}
+        # leased connection -> its owner's callbacks by event name; each entry is
+        # replaced, never mutated, so a dispatch in flight keeps a consistent view
+        self._session_handlers: Dict[OpenAIRealtimeClient, Dict[str, Callable]] = {}
+        self._greeting_counter = itertools.count()
+        # (persona_id, session_config_version) -> audio-input session.update payload
+        self._audio_session_updates: Dict[Tuple[str, int], Dict] = {}
         self.personas = {
             "astrologer": Persona(
                 id="astrologer",
@@ -31,7 +120,8 @@ class PersonaManager:
                 description="Wise and compassionate astrologer offering mystical insights",
                 prompt="You are a wise and compassionate astrologer. Speak in a mystical yet reassuring tone, offering insights about zodiac signs, planetary alignments, and life paths. Use metaphors and gentle guidance to make the user feel inspired and hopeful. Keep explanations clear and personalized as if you are reading their stars.",
                 color="#FFD700",
-                icon="🌟"
+                icon="🌟",
+                voice="nova"  # Calm, mystical voice
             ),
             "health": Persona(
                 id="health",
@@ -39,7 +129,8 @@ class PersonaManager:
                 description="Certified health and nutrition consultant",
                 prompt="You are a certified health and nutrition consultant. Speak in a friendly, practical, and motivating tone. Offer science-based advice on diet, fitness, and lifestyle habits. Adjust recommendations to the user's context, avoiding medical jargon. Encourage progress and small wins while making health feel achievable.",
                 color="#4CAF50",
-                icon="🍎"
+                icon="🍎",
+                voice="alloy"  # Professional, clear voice
             ),
             "emotional": Persona(
                 id="emotional",
@@ -47,7 +138,8 @@ class PersonaManager:
                 description="Warm emotional support and guidance",
                 prompt="You are a warm, non-judgmental consultant friend. Listen actively, validate emotions, and create a safe space where the user can open up. Use empathy, reflective listening, and gentle questions to help them process feelings. Avoid giving hard solutions unless asked; focus on emotional connection and encouragement.",
                 color="#FF69B4",
-                icon="💝"
+                icon="💝",
+                voice="shimmer"  # Warm, empathetic voice
             ),
             "windows": Persona(
                 id="windows",
@@ -55,7 +147,8 @@ class PersonaManager:
                 description="Expert in aluminum and wooden windows",
                 prompt="You are a persuasive yet friendly sales consultant specializing in aluminum and wooden windows. Highlight product benefits like durability, design, and energy efficiency. Tailor pitches to the user's needs (cost, aesthetics, maintenance). Use conversational selling with confidence but never pushy — focus on trust.",
                 color="#8B4513",
-                icon="🪟"
+                icon="🪟",
+                voice="echo"  # Confident, sales voice
             ),
             "cars": Persona(
                 id="cars",
@@ -63,7 +156,8 @@ class PersonaManager:
                 description="Enthusiastic car sales consultant",
                 prompt="You are a car sales consultant. Be enthusiastic, knowledgeable, and approachable. Help the user explore car options, explain features, compare models, and guide them toward the right fit. Emphasize safety, performance, and lifestyle compatibility. Use storytelling and real-world examples to make it engaging.",
                 color="#FF4500",
-                icon="🚗"
+                icon="🚗",
+                voice="fable"  # Enthusiastic, engaging voice
             ),
             "general": Persona(
                 id="general",
@@ -71,66 +165,114 @@ class PersonaManager:
                 description="Versatile professional conversation partner",
                 prompt="You are a versatile conversational partner who can adapt across casual chat, business brainstorming, and light mentorship. Keep the tone professional yet approachable. Engage with curiosity, provide insights when asked, and keep conversations flowing naturally, as if in real life.",
                 color="#2196F3",
-                icon="💼"
+                icon="💼",
+                voice="onyx"  # Professional, versatile voice
             )
         }
+        self.reload()
+
+    def reload(self):
+        """Rebuild the cached persona listings after self.personas changes"""
+        # Shared by every caller, so treat the returned dicts as read-only
+        self._persona_dicts = {persona_id: asdict(persona) for persona_id, persona in self.personas.items()}
+        self._all_personas = list(self._persona_dicts.values())
+        self._all_personas_json = orjson.dumps({"personas": self._all_personas})
+        self._persona_json = {
+            persona_id: orjson.dumps({"persona": persona}) for persona_id, persona in self._persona_dicts.items()
+        }
+        # Conversation-start payloads never change per persona, so build them once
+        self._session_update_events = {
+            persona_id: orjson.dumps({"type": "session.update", **self._build_session_update(persona)}).decode()
+            for persona_id, persona in self.personas.items()
+        }
+        self._greeting_items = {
+            persona_id: self._build_greeting_item(GREETINGS.get(persona_id, DEFAULT_GREETING))
+            for persona_id in self.personas
+        }
+        self._audio_session_updates.clear()
 
     def get_all_personas(self) -> List[Dict]:
         """Get all personas as dictionaries"""
-        return [persona.dict() for persona in self.personas.values()]
+        return self._all_personas
+
+    def get_all_personas_json(self) -> bytes:
+        """Get all personas as a pre-encoded {"personas": [...]} JSON body"""
+        return self._all_personas_json
+
+    def get_persona_json(self, persona_id: str) -> Optional[bytes]:
+        """Get a persona as a pre-encoded {"persona": {...}} JSON body"""
+        return self._persona_json.get(persona_id)
 
     def get_persona(self, persona_id: str) -> Optional[Dict]:
         """Get a specific persona by ID"""
-        persona = self.personas.get(persona_id)
-        return persona.dict() if persona else None
+        return self._persona_dicts.get(persona_id)
+
+    async def warmup(self):
+        """Pre-connect the OpenAI realtime client pool"""
+        await self.client_pool.warmup()
 
-    async def initialize_openai_client(self):
-        """Initialize the OpenAI realtime client"""
-        if not self.openai_client:
+    def get_openai_client(self, client_id: str) -> Optional[OpenAIRealtimeClient]:
+        """Get the OpenAI connection leased to a client, if any"""
+        return self.client_sessions.get(client_id)
+
+    async def _lease_openai_client(self, client_id: str) -> OpenAIRealtimeClient:
+        """Lease a pooled OpenAI connection for a client, reusing its current lease"""
+        openai_client = self.client_sessions.get(client_id)
+        if openai_client is None:
             try:
-                self.openai_client = OpenAIRealtimeClient()
-                await self.openai_client.connect()
-                self._setup_event_handlers()
-                logger.info("OpenAI Realtime client initialized")
+                openai_client = await self.client_pool.acquire()
             except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
+                logger.error("Failed to acquire OpenAI client: %s", e)
                 raise
+            self.client_sessions[client_id] = openai_client
+        return openai_client
+
+    def _release_openai_client(self, client_id: str):
+        """Return a client's leased connection to the pool"""
+        openai_client = self.client_sessions.pop(client_id, None)
+        if openai_client is not None:
+            self._session_handlers.pop(openai_client, None)
+            self.client_pool.release(openai_client)
 
-    def _setup_event_handlers(self):
+    def _setup_event_handlers(self, openai_client: OpenAIRealtimeClient):
         """Setup event handlers for OpenAI realtime events"""
-        if not self.openai_client:
-            return
 
 # Text handlers removed - voice-only application
 
         async def handle_audio_delta(event):
             """Handle streaming audio response"""
-            logger.info(f"Received audio delta: {len(str(event))} bytes")
-            for client_id, handlers in self.current_response_handlers.items():
-                if 'audio_delta' in handlers:
-                    try:
-                        await handlers['audio_delta'](event)
-                    except Exception as e:
-                        logger.error(f"Error in audio_delta handler: {e}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received audio delta: %d chars", len(event.get("delta") or ""))
+            await self._notify_owner(openai_client, 'audio_delta', event)
 
         async def handle_audio_done(event):
             """Handle completed audio response"""
-            logger.info("Audio response completed")
-            for client_id, handlers in self.current_response_handlers.items():
-                if 'audio_done' in handlers:
-                    try:
-                        await handlers['audio_done'](event)
-                    except Exception as e:
-                        logger.error(f"Error in audio_done handler: {e}")
+            logger.debug("Audio response completed")
+            await self._notify_owner(openai_client, 'audio_done', event)
 
         async def handle_error(event):
             """Handle API errors"""
-            logger.error(f"OpenAI API error: {event}")
+            logger.error("OpenAI API error: %s", event)
 
         # Register event handlers (audio only)
-        self.openai_client.on_event("response.audio.delta", handle_audio_delta)
-        self.openai_client.on_event("response.audio.done", handle_audio_done)
-        self.openai_client.on_event("error", handle_error)
+        openai_client.on_event("response.audio.delta", handle_audio_delta)
+        openai_client.on_event("response.audio.done", handle_audio_done)
+        openai_client.on_event("error", handle_error)
+
+    async def _notify_owner(self, openai_client: OpenAIRealtimeClient, event_name: str, event: Dict):
+        """Run the handler of the client that leased this connection"""
+        handlers = self._session_handlers.get(openai_client)
+        if handlers is None:
+            return
+
+        handler = handlers.get(event_name)
+        if handler is None:
+            return
+
+        try:
+            await handler(event)
+        except Exception as e:
+            logger.error("Error in %s handler: %s", event_name, e)
 
 # Text-based response generation removed - voice-only application
 
@@ -140,92 +282,79 @@ class PersonaManager:
         if not persona:
             return {"error": "Persona not found"}
 
-        if not self.openai_client:
-            await self.initialize_openai_client()
-
         try:
-            logger.info(f"Setting up conversation for persona {persona_id}")
+            openai_client = await self._lease_openai_client(client_id)
+            logger.info("Setting up conversation for persona %s", persona_id)
 
             # Set up response handlers for this client
             if client_id and response_handlers:
-                self.current_response_handlers[client_id] = response_handlers
-                logger.info(f"Set up response handlers for client {client_id}")
-
-            # Configure session for human-like continuous conversation
-            session_update = {
-                "session": {
-                    "modalities": ["text", "audio"],
-                    "instructions": f"{persona.prompt}\n\nIMPORTANT: You are having a natural voice conversation. Respond conversationally and authentically. Keep responses engaging but concise (1-2 sentences). Always acknowledge what the user says and continue the conversation naturally.",
-                    "voice": self._get_persona_voice(persona_id),
-                    "input_audio_format": "pcm16",
-                    "output_audio_format": "pcm16",
-                    "input_audio_transcription": {"model": "whisper-1"},
-                    "turn_detection": {
-                        "type": "server_vad",
-                        "threshold": 0.6,  # Less sensitive - wait for clearer speech ending
-                        "prefix_padding_ms": 400,  # More padding to catch full speech
-                        "silence_duration_ms": 1200  # Wait longer for natural pauses
-                    },
-                    "temperature": 0.85,  # Natural but consistent responses
-                    "max_response_output_tokens": 150,  # Allow slightly longer responses
-                    "tool_choice": "none"  # Disable tool calling for faster responses
-                }
-            }
+                self._subscribe_client(openai_client, response_handlers)
+                logger.info("Set up response handlers for client %s", client_id)
 
-            logger.info(f"Sending session update for continuous conversation")
-            await self.openai_client.send_event("session.update", session_update)
+            logger.info("Sending session update for continuous conversation")
+            await openai_client.send_raw_event(self._session_update_events[persona_id])
 
             # Clear input audio buffer and start fresh
-            await self.openai_client.send_event("input_audio_buffer.clear")
+            await openai_client.send_raw_event(CLEAR_AUDIO_BUFFER_EVENT)
 
             # Generate an initial greeting from the persona
-            await self._send_initial_greeting(persona_id)
+            await self._send_initial_greeting(openai_client, persona_id)
 
             logger.info("Conversation session configured successfully")
             return {"status": "conversation_started"}
 
         except Exception as e:
-            logger.error(f"Error starting conversation: {e}", exc_info=True)
+            logger.error("Error starting conversation: %s", e, exc_info=True)
             return {"error": str(e)}
 
-    async def _send_initial_greeting(self, persona_id: str):
-        """Send an initial greeting message to start the conversation"""
-        greetings = {
-            "astrologer": "Hello, beautiful soul! The stars have guided you here today. I sense positive energy around you. What would you like to explore about your cosmic journey?",
-            "health": "Hi there! I'm so excited to help you on your wellness journey today. Whether it's nutrition, fitness, or healthy habits, I'm here to support you. What health goals are you working on?",
-            "emotional": "Hello, dear friend. I'm really glad you're here. This is a safe space where you can share whatever is on your heart. How are you feeling today?",
-            "windows": "Good day! Thanks for considering us for your window needs. I'm here to help you find the perfect windows that combine beauty, efficiency, and value. What type of project are you working on?",
-            "cars": "Hey there! Great to meet you! I'm pumped to help you find the perfect vehicle. Whether you're looking for reliability, performance, or style, we'll find something amazing together. What kind of driving do you do most?",
-            "general": "Hello! It's great to connect with you today. I'm here for whatever you'd like to discuss - business ideas, casual conversation, or brainstorming. What's on your mind?"
+    def _build_session_update(self, persona: Persona) -> Dict:
+        """Build the session.update payload for a human-like continuous conversation"""
+        return {
+            "session": {
+                **_BASE_SESSION,
+                "instructions": persona.prompt + VOICE_CONVERSATION_GUIDANCE,
+                "voice": persona.voice
+            }
         }
 
-        greeting = greetings.get(persona_id, "Hello! How can I help you today?")
-
-        # Create a text message to trigger an audio response
-        timestamp = str(int(datetime.now().timestamp() * 1000000))
-        await self.openai_client.send_event("conversation.item.create", {
-            "item": {
-                "id": f"greeting_{timestamp}",
-                "type": "message",
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": greeting
-                    }
-                ]
+    def _get_audio_session_update(self, persona: Persona, openai_client: OpenAIRealtimeClient) -> Dict:
+        """Get the cached session.update payload for audio input, rebuilt if session_config changed"""
+        key = (persona.id, openai_client.session_config_version)
+        session_update = self._audio_session_updates.get(key)
+        if session_update is None:
+            session_update = self._audio_session_updates[key] = {
+                "session": {
+                    **openai_client.session_config,
+                    **_AUDIO_INPUT_SESSION,
+                    "instructions": persona.prompt
+                }
             }
-        })
+        return session_update
+
+    def _build_greeting_item(self, greeting: str) -> Dict:
+        """Build the assistant message that carries a persona greeting"""
+        return {
+            "type": "message",
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": greeting
+                }
+            ]
+        }
 
-        # Generate the audio response
-        await self.openai_client.send_event("response.create", {
-            "response": {
-                "modalities": ["audio"],
-                "instructions": "Speak this greeting message naturally with the persona's characteristic voice and tone. Be warm and engaging."
-            }
-        })
+    async def _send_initial_greeting(self, openai_client: OpenAIRealtimeClient, persona_id: str):
+        """Send an initial greeting message to start the conversation"""
+        item = self._greeting_items.get(persona_id) or self._build_greeting_item(DEFAULT_GREETING)
+
+        # Create a text message and ask for it to be voiced; only the id varies per call
+        await openai_client.send_events([
+            ("conversation.item.create", {"item": {**item, "id": f"greeting_{next(self._greeting_counter)}"}}),
+            ("response.create", GREETING_RESPONSE)
+        ])
 
-        logger.info(f"Sent initial greeting for persona {persona_id}")
+        logger.info("Sent initial greeting for persona %s", persona_id)
 
     async def generate_audio_response(self, persona_id: str, audio_data: bytes, client_id: str = None, response_handlers: Dict = None):
         """Generate AI voice response from audio input - core voice-to-voice functionality"""
@@ -233,33 +362,18 @@ class PersonaManager:
         if not persona:
             return {"error": "Persona not found"}
 
-        if not self.openai_client:
-            await self.initialize_openai_client()
-
         try:
+            openai_client = await self._lease_openai_client(client_id)
+
             # Set up response handlers for this client
             if client_id and response_handlers:
-                self.current_response_handlers[client_id] = response_handlers
+                self._subscribe_client(openai_client, response_handlers)
 
             # Configure session for voice-focused with persona characteristics
-            await self.openai_client.send_event("session.update", {
-                "session": {
-                    **self.openai_client.session_config,
-                    "modalities": ["audio", "text"],  # Must include both audio and text
-                    "instructions": persona.prompt,
-                    "voice": "alloy",
-                    "input_audio_transcription": {"model": "whisper-1"},
-                    "turn_detection": {
-                        "type": "server_vad",
-                        "threshold": 0.5,
-                        "prefix_padding_ms": 300,
-                        "silence_duration_ms": 500
-                    }
-                }
-            })
+            await openai_client.send_event("session.update", self._get_audio_session_update(persona, openai_client))
 
             # Send audio message with persona instructions
-            await self.openai_client.send_audio_message(
+            await openai_client.send_audio_message(
                 audio_data,
                 persona_instructions=persona.prompt
             )
@@ -267,22 +381,10 @@ class PersonaManager:
             return {"status": "voice_processing"}
 
         except Exception as e:
-            logger.error(f"Error processing audio: {e}")
+            logger.error("Error processing audio: %s", e)
             return {"error": str(e)}
 
-    def _get_persona_voice(self, persona_id: str) -> str:
-        """Get appropriate voice for each persona"""
-        voice_mapping = {
-            "astrologer": "nova",      # Calm, mystical voice
-            "health": "alloy",         # Professional, clear voice
-            "emotional": "shimmer",    # Warm, empathetic voice
-            "windows": "echo",         # Confident, sales voice
-            "cars": "fable",          # Enthusiastic, engaging voice
-            "general": "onyx"         # Professional, versatile voice
-        }
-        return voice_mapping.get(persona_id, "alloy")
-
-    async def _generate_fallback_response(self, persona_id: str, user_message: str) -> str:
+    def _generate_fallback_response(self, persona_id: str, user_message: str) -> str:
         """Generate fallback response when OpenAI is unavailable"""
         responses = {
             "astrologer": self._generate_astrologer_response(user_message),
@@ -293,70 +395,73 @@ class PersonaManager:
             "general": self._generate_general_response(user_message)
         }
 
-        await asyncio.sleep(1)  # Simulate processing
         return responses.get(persona_id, "I'm here to help! How can I assist you today?")
 
+    def _subscribe_client(self, openai_client: OpenAIRealtimeClient, response_handlers: Dict[str, Callable]):
+        """Replace the response handlers bound to a leased connection"""
+        # Copied so later changes to the caller's dict cannot leak into dispatch
+        self._session_handlers[openai_client] = dict(response_handlers)
+
     async def cleanup_client_handlers(self, client_id: str):
-        """Clean up response handlers for a disconnected client"""
-        if client_id in self.current_response_handlers:
-            del self.current_response_handlers[client_id]
+        """Clean up response handlers and the OpenAI lease for a disconnected client"""
+        self._release_openai_client(client_id)
 
     async def close(self):
-        """Close the OpenAI client connection"""
-        if self.openai_client:
-            await self.openai_client.disconnect()
-            self.openai_client = None
+        """Close every pooled OpenAI client connection"""
+        self.client_sessions.clear()
+        self._session_handlers.clear()
+        await self.client_pool.close()
 
     def _generate_astrologer_response(self, message: str) -> str:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["horoscope", "zodiac", "sign", "stars"]):
+        words = _words(message)
+        if words & _ASTROLOGY_WORDS:
             return "🌟 The stars whisper of great potential in your path. Your celestial energy suggests a time of transformation and growth. What zodiac sign guides your journey, dear soul?"
-        elif any(word in message_lower for word in ["future", "prediction", "destiny"]):
+        elif words & _DESTINY_WORDS:
             return "✨ The cosmic tapestry reveals that your future holds beautiful possibilities. The planets align to support your dreams, but remember - you are the co-creator of your destiny. Trust in the universe's timing."
         else:
             return "🌙 Welcome, kindred spirit. The universe has guided you here for a reason. Share what weighs on your heart, and let the stars illuminate your path forward."
 
     def _generate_health_response(self, message: str) -> str:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["diet", "food", "eat", "nutrition"]):
+        words = _words(message)
+        if words & _NUTRITION_WORDS:
             return "🍎 Great question about nutrition! Remember, small sustainable changes make the biggest impact. Focus on adding more whole foods rather than restricting. What specific nutrition goals are you working toward?"
-        elif any(word in message_lower for word in ["exercise", "workout", "fitness", "gym"]):
+        elif words & _FITNESS_WORDS:
             return "💪 I love that you're thinking about fitness! The best workout is the one you'll actually do consistently. Start with 15-20 minutes of movement you enjoy. What activities make you feel energized?"
         else:
             return "🌟 Hello! I'm here to help you on your wellness journey. Whether it's nutrition, fitness, or healthy habits, we can work together to make health feel achievable and enjoyable. What would you like to focus on today?"
 
     def _generate_emotional_response(self, message: str) -> str:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["stressed", "anxious", "worried", "overwhelmed"]):
+        words = _words(message)
+        if words & _STRESS_WORDS:
             return "💙 I hear you, and what you're feeling is completely valid. It's okay to feel overwhelmed sometimes - it shows you care deeply. Take a deep breath with me. What's weighing most heavily on your heart right now?"
-        elif any(word in message_lower for word in ["sad", "down", "depressed", "hurt"]):
+        elif words & _SADNESS_WORDS:
             return "🤗 I'm so glad you felt safe enough to share that with me. Your feelings matter, and you don't have to carry this alone. Sometimes just naming what we're feeling can be the first step. I'm here to listen without judgment."
         else:
             return "💝 Hello, dear friend. This is a safe space where you can be completely yourself. I'm here to listen, support, and walk alongside you through whatever you're experiencing. What's on your mind today?"
 
     def _generate_windows_response(self, message: str) -> str:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["aluminum", "aluminium", "metal"]):
+        words = _words(message)
+        if words & _ALUMINUM_WORDS:
             return "🪟 Excellent choice considering aluminum windows! They offer outstanding durability and virtually zero maintenance. Plus, modern aluminum frames provide superior energy efficiency with thermal breaks. What's your primary focus - longevity, aesthetics, or energy savings?"
-        elif any(word in message_lower for word in ["wood", "wooden", "timber"]):
+        elif words & _WOOD_WORDS:
             return "🌳 Wooden windows bring such warmth and character to a home! They offer natural insulation properties and can be customized to match any architectural style. While they need some maintenance, the beauty and value they add is incomparable. Are you drawn to a traditional or contemporary wood design?"
         else:
             return "🏠 Welcome! I'm excited to help you find the perfect windows for your space. Whether you're drawn to the sleek durability of aluminum or the timeless beauty of wood, we'll find something that matches your style, budget, and performance needs. What's your vision for your windows?"
 
     def _generate_cars_response(self, message: str) -> str:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["suv", "family", "kids", "space"]):
+        words = _words(message)
+        if words & _FAMILY_CAR_WORDS:
             return "🚗 A family vehicle - now that's an exciting decision! SUVs offer incredible versatility, safety features, and that commanding road view. Whether it's weekend adventures or daily school runs, the right SUV becomes your family's trusted companion. What size family are we planning for?"
-        elif any(word in message_lower for word in ["sedan", "car", "fuel", "economy"]):
+        elif words & _SEDAN_WORDS:
             return "🌟 Sedans are fantastic - smooth ride, excellent fuel economy, and perfect for daily commuting! Modern sedans pack surprising amounts of tech and safety features too. Are you looking for something sporty and fun, or more focused on comfort and efficiency?"
         else:
             return "🚙 Hey there! I'm thrilled to help you find your next perfect ride. Every car has a story, and I'm here to help you find the one that fits yours. Whether it's your first car, an upgrade, or something completely different - let's discover what gets you excited! What brings you car shopping today?"
 
     def _generate_general_response(self, message: str) -> str:
-        message_lower = message.lower()
-        if any(word in message_lower for word in ["business", "work", "professional", "career"]):
+        words = _words(message)
+        if words & _BUSINESS_WORDS:
             return "💼 That's a great professional topic! I'd love to explore this with you. Business success often comes down to understanding people, solving real problems, and building genuine relationships. What specific aspect would you like to dive into?"
-        elif any(word in message_lower for word in ["idea", "brainstorm", "creative", "innovation"]):
+        elif words & _IDEA_WORDS:
             return "💡 I love brainstorming sessions! The best ideas often come from combining unexpected perspectives. Let's think creatively and explore possibilities together. What's the challenge or opportunity you're working with?"
         else:
             return "👋 Great to connect with you! I enjoy engaging conversations across all kinds of topics - whether it's business strategy, creative projects, or just exploring interesting ideas together. What's capturing your interest these days?"
\ No newline at end of file
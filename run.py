@@ -27,30 +27,39 @@ def main():
         else:
             print("✅ OpenAI API key detected - GPT Realtime API enabled!\n")
 
-        print("🚀 Starting AI Voice Personas - Realtime Voice Chat Server...")
-        print("📱 Open your browser to: http://localhost:8000")
-        print("🔌 WebSocket endpoint: ws://localhost:8000/ws/{client_id}")
-        print("📊 API docs available at: http://localhost:8000/docs")
-        print("\n🎤 Voice-Only AI Personas:")
-        print("   🌟 Gold Astrologer - Mystical voice with cosmic wisdom")
-        print("   🍎 Health & Dietitian - Professional wellness guidance")
-        print("   💝 Consultant Friend - Warm emotional support")
-        print("   🪟 Window Sales Specialist - Confident sales expertise")
-        print("   🚗 Car Sales Specialist - Enthusiastic vehicle advice")
-        print("   💼 Business Conversationalist - Professional discussions")
-        print("\n🗣️ Pure Voice Interaction:")
-        print("   • Hold microphone button to speak")
-        print("   • Real-time voice-to-voice conversation")
-        print("   • Each persona has unique voice and personality")
-        print("   • No text interface - 100% voice experience")
-        print("   • Press Space bar or hold mic button to talk")
-        print("\n⚡ Press Ctrl+C to stop the server\n")
+        # QUIET=1 skips the banner, e.g. when logs are collected in production
+        if os.getenv("QUIET") != "1":
+            print("🚀 Starting AI Voice Personas - Realtime Voice Chat Server...")
+            print("📱 Open your browser to: http://localhost:8000")
+            print("🔌 WebSocket endpoint: ws://localhost:8000/ws/{client_id}")
+            print("📊 API docs available at: http://localhost:8000/docs")
+            print("\n🎤 Voice-Only AI Personas:")
+            print("   🌟 Gold Astrologer - Mystical voice with cosmic wisdom")
+            print("   🍎 Health & Dietitian - Professional wellness guidance")
+            print("   💝 Consultant Friend - Warm emotional support")
+            print("   🪟 Window Sales Specialist - Confident sales expertise")
+            print("   🚗 Car Sales Specialist - Enthusiastic vehicle advice")
+            print("   💼 Business Conversationalist - Professional discussions")
+            print("\n🗣️ Pure Voice Interaction:")
+            print("   • Hold microphone button to speak")
+            print("   • Real-time voice-to-voice conversation")
+            print("   • Each persona has unique voice and personality")
+            print("   • No text interface - 100% voice experience")
+            print("   • Press Space bar or hold mic button to talk")
+            print("\n⚡ Press Ctrl+C to stop the server\n")
+
+        # The reload supervisor is for development only
+        reload = os.getenv("DEV_RELOAD", "0") == "1"
+        # Extra worker processes only apply when reload is off
+        workers = 1 if reload else int(os.getenv("WORKERS", "1"))
 
         uvicorn.run(
             "main:app",
             host="0.0.0.0",
             port=8000,
-            reload=True,
+            reload=reload,
+            workers=workers,
+            loop="uvloop",
             log_level="info"
         )
     except KeyboardInterrupt:
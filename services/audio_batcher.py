@@ -0,0 +1,82 @@
+import asyncio
+from typing import Awaitable, Callable, Optional, Set, Union
+
+class AudioBatcher:
+    """Coalesces small audio chunks into fewer, larger upstream appends"""
+
+    def __init__(self, sink: Callable[[bytes], Awaitable], flush_delay: float = 0.010, max_batch_bytes: int = 32768,
+                 max_in_flight: int = 4):
+        # sink receives each coalesced batch and is responsible for its own error handling
+        self.sink = sink
+        self.flush_delay = flush_delay
+        self.max_batch_bytes = max_batch_bytes
+        self._buffer = bytearray()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # Uploads run in the background so the caller can keep receiving;
+        # the semaphore bounds them and, being FIFO, keeps batches in order
+        self._upload_slots = asyncio.Semaphore(max_in_flight)
+        self._uploads: Set[asyncio.Task] = set()
+
+    async def append(self, audio_data: Union[bytes, memoryview]):
+        """Buffer an audio chunk, flushing right away once the batch is full"""
+        self._buffer.extend(audio_data)
+        # A zero delay turns batching off, for the snappiest VAD turn-taking
+        if len(self._buffer) >= self.max_batch_bytes or self.flush_delay <= 0:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self._flush_later)
+
+    def _flush_later(self):
+        """Timer callback that flushes whatever arrived within flush_delay"""
+        self._flush_handle = None
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Start uploading all buffered audio as a single chunk"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._buffer:
+            return
+
+        # Waits only when max_in_flight uploads are already pending (backpressure)
+        await self._upload_slots.acquire()
+        if not self._buffer:
+            self._upload_slots.release()
+            return
+
+        audio_data = bytes(self._buffer)
+        self._buffer.clear()
+        task = asyncio.create_task(self._upload(audio_data))
+        self._uploads.add(task)
+        task.add_done_callback(self._uploads.discard)
+
+    async def _upload(self, audio_data: bytes):
+        """Hand one batch to the sink and free its upload slot"""
+        try:
+            await self.sink(audio_data)
+        finally:
+            self._upload_slots.release()
+
+    async def drain(self):
+        """Wait until every started upload has completed"""
+        if self._uploads:
+            await asyncio.gather(*self._uploads, return_exceptions=True)
+
+    def close(self):
+        """Drop any buffered audio and cancel the pending flush"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._buffer.clear()
+
+    async def abort(self):
+        """Drop buffered audio, cancel pending and in-flight uploads and wait for them to stop"""
+        self.close()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        for task in self._uploads:
+            task.cancel()
+        await self.drain()
@@ -1,10 +1,10 @@
 import asyncio
-import json
 import logging
+import orjson
+import pybase64
 import websockets
-import base64
-from typing import Dict, List, Optional, Callable
-from datetime import datetime
+from typing import Dict, List, Optional, Callable, Set, Tuple, Union
+import itertools
 import os
 from dotenv import load_dotenv
 
@@ -12,6 +12,31 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Version 0 is the default session_config; every runtime change draws a fresh
+# number, so equal versions always mean equal configs across clients
+_session_config_versions = itertools.count(1)
+
+# input_audio_buffer.append is sent for every audio batch, so it is assembled
+# from these pieces instead of going through dict building and orjson
+# (base64 never needs JSON escaping)
+_APPEND_AUDIO_PREFIX = '{"type":"input_audio_buffer.append","event_id":"e'
+_APPEND_AUDIO_MID = '","audio":"'
+_APPEND_AUDIO_SUFFIX = '"}'
+
+AUDIO_DELTA_EVENT = "response.audio.delta"
+
+# Whole utterances at least this large are base64-encoded in a worker thread
+_OFFLOAD_ENCODE_BYTES = 65536
+
+# Server events are serialized with their type first, so it can be read
+# without parsing the (often large) rest of the message
+_EVENT_TYPE_PREFIX = '{"type":"'
+_EVENT_TYPE_START = len(_EVENT_TYPE_PREFIX)
+_DELTA_FIELD = '"delta":"'
+
+# How pre-encoded session.update events start (orjson keeps key order)
+_SESSION_UPDATE_PREFIX = '{"type":"session.update"'
+
 class OpenAIRealtimeClient:
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -21,7 +46,12 @@ class OpenAIRealtimeClient:
         self.url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
         self.websocket = None
         self.is_connected = False
-        self.event_handlers: Dict[str, List[Callable]] = {}
+        # Tuples are rebuilt on registration, so dispatch never sees a list change mid-loop
+        self.event_handlers: Dict[str, Tuple[Callable, ...]] = {}
+        # Audio deltas arrive many times per second and skip the dict lookup
+        self._audio_delta_handlers: Tuple[Callable, ...] = ()
+        # Unhandled types (e.g. transcript deltas) can arrive per frame, so warn once each
+        self._warned_types: Set[str] = set()
         self.session_config = {
             "modalities": ["text", "audio"],
             "instructions": "",
@@ -42,6 +72,13 @@ class OpenAIRealtimeClient:
             "temperature": 0.85,
             "max_response_output_tokens": 100
         }
+        # Lets callers cache payloads derived from session_config
+        self.session_config_version = 0
+        # Instructions the server session currently has, to skip redundant updates
+        self._current_instructions = None
+        # Event and item IDs only need to be unique, so a counter replaces timestamps;
+        # they are written in hex to keep every frame a few bytes shorter
+        self._ids = itertools.count(1)
 
     async def connect(self):
         """Connect to OpenAI Realtime API"""
@@ -55,14 +92,16 @@ class OpenAIRealtimeClient:
                 self.url,
                 extra_headers=headers,
                 ping_interval=20,
-                ping_timeout=10
+                ping_timeout=10,
+                # Payloads are base64 audio that barely deflates; skip the per-frame CPU
+                compression=None
             )
 
             self.is_connected = True
             logger.info("Connected to OpenAI Realtime API")
 
             # Start listening for events
-            asyncio.create_task(self._listen_for_events())
+            asyncio.create_task(self._listen_for_events(self.websocket))
 
             # Send session configuration
             await self.send_event("session.update", {"session": self.session_config})
@@ -74,9 +113,14 @@ class OpenAIRealtimeClient:
 
     async def disconnect(self):
         """Disconnect from OpenAI Realtime API"""
-        if self.websocket and not self.websocket.closed:
-            await self.websocket.close()
+        # Detach first so no other coroutine sends on a socket that is closing
+        websocket, self.websocket = self.websocket, None
         self.is_connected = False
+        if websocket is not None:
+            try:
+                await websocket.close()
+            except Exception as e:
+                logger.debug("Ignoring error while closing OpenAI socket: %s", e)
         logger.info("Disconnected from OpenAI Realtime API")
 
     async def send_event(self, event_type: str, data: Dict = None):
@@ -84,79 +128,155 @@ class OpenAIRealtimeClient:
         if not self.is_connected or not self.websocket:
             raise ConnectionError("Not connected to OpenAI Realtime API")
 
-        # Generate valid event ID (alphanumeric + underscore/dash only)
-        timestamp = str(int(datetime.now().timestamp() * 1000000))
-        event_id = f"evt_{timestamp}"
+        await self.websocket.send(self._encode_event(event_type, data))
+        self._track_instructions(event_type, data)
+        logger.debug(f"Sent event: {event_type}")
+
+    async def send_events(self, events: List[Tuple[str, Optional[Dict]]]):
+        """Send several (event_type, data) events back-to-back"""
+        if not self.is_connected or not self.websocket:
+            raise ConnectionError("Not connected to OpenAI Realtime API")
+
+        # send() only waits when the write buffer is full, so the frames leave together
+        for event_type, data in events:
+            await self.websocket.send(self._encode_event(event_type, data))
+            self._track_instructions(event_type, data)
+        logger.debug(f"Sent {len(events)} events")
 
+    def _encode_event(self, event_type: str, data: Dict = None) -> str:
+        """Serialize an event with a fresh event ID"""
         event = {
-            "event_id": event_id,
+            "event_id": self._next_event_id(),
             "type": event_type
         }
 
         if data:
             event.update(data)
 
-        await self.websocket.send(json.dumps(event))
-        logger.debug(f"Sent event: {event_type}")
+        # Decoded so the API still receives a text frame
+        return orjson.dumps(event).decode()
+
+    def _track_instructions(self, event_type: str, data: Optional[Dict]):
+        """Remember the instructions a sent session.update gave the server session"""
+        if event_type == "session.update" and data:
+            instructions = data.get("session", {}).get("instructions")
+            if instructions is not None:
+                self._current_instructions = instructions
+
+    def _next_event_id(self) -> str:
+        """Generate a valid event ID (alphanumeric + underscore/dash only)"""
+        return f"e{next(self._ids):x}"
+
+    async def send_raw_event(self, payload: str):
+        """Send a pre-serialized event to the OpenAI Realtime API"""
+        if not self.is_connected or not self.websocket:
+            raise ConnectionError("Not connected to OpenAI Realtime API")
+
+        # event_id is optional, so constant events can be encoded once and reused
+        await self.websocket.send(payload)
+        if payload.startswith(_SESSION_UPDATE_PREFIX):
+            # Not worth parsing back; just stop trusting the cached instructions
+            self._current_instructions = None
 
-    async def _listen_for_events(self):
+    async def _listen_for_events(self, websocket):
         """Listen for events from OpenAI Realtime API"""
         try:
-            async for message in self.websocket:
+            async for message in websocket:
                 try:
-                    event = json.loads(message)
+                    # Skip decoding events nobody listens to; anything not in the
+                    # expected layout falls through to a full parse
+                    if isinstance(message, str) and message.startswith(_EVENT_TYPE_PREFIX):
+                        type_end = message.find('"', _EVENT_TYPE_START)
+                        event_type = message[_EVENT_TYPE_START:type_end] if type_end > 0 else None
+                        if event_type and event_type not in self.event_handlers:
+                            self._log_unhandled(event_type)
+                            continue
+
+                        # Audio deltas are mostly base64 and handlers only read the
+                        # delta, so slice it out instead of decoding the whole event
+                        if event_type == AUDIO_DELTA_EVENT:
+                            delta_start = message.find(_DELTA_FIELD, type_end)
+                            if delta_start > 0:
+                                delta_start += len(_DELTA_FIELD)
+                                delta_end = message.find('"', delta_start)
+                                if delta_end > 0:
+                                    await self._handle_event(
+                                        AUDIO_DELTA_EVENT,
+                                        {"type": AUDIO_DELTA_EVENT, "delta": message[delta_start:delta_end]}
+                                    )
+                                    continue
+
+                    event = orjson.loads(message)
                     event_type = event.get("type")
 
                     if event_type:
                         await self._handle_event(event_type, event)
 
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.error(f"Failed to parse message: {e}")
 
         except websockets.exceptions.ConnectionClosed:
             logger.info("OpenAI Realtime API connection closed")
-            self.is_connected = False
         except Exception as e:
             logger.error(f"Error listening for events: {e}")
+
+        # A reconnect may already have replaced this socket; only report our own closure
+        if self.websocket is websocket:
             self.is_connected = False
 
     async def _handle_event(self, event_type: str, event: Dict):
         """Handle incoming events from OpenAI Realtime API"""
-        logger.info(f"Received OpenAI event: {event_type}")
-        logger.debug(f"Event data: {event}")
-
-        handlers = self.event_handlers.get(event_type, [])
+        # Audio deltas arrive many times per second, so they are only logged at debug level
+        if event_type == AUDIO_DELTA_EVENT:
+            handlers = self._audio_delta_handlers
+        else:
+            logger.info("Received OpenAI event: %s", event_type)
+            handlers = self.event_handlers.get(event_type)
+
+        # repr of an audio delta includes its whole base64 payload
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Event data: %r", event)
         if not handlers:
-            logger.warning(f"No handlers registered for event type: {event_type}")
+            return
 
         for handler in handlers:
             try:
                 await handler(event)
             except Exception as e:
-                logger.error(f"Error in event handler for {event_type}: {e}")
+                logger.error("Error in event handler for %s: %s", event_type, e)
+
+    def _log_unhandled(self, event_type: str):
+        """Warn the first time an event type without handlers arrives, then log at debug"""
+        if event_type in self._warned_types:
+            logger.debug("No handlers registered for event type: %s", event_type)
+            return
+        self._warned_types.add(event_type)
+        logger.warning("No handlers registered for event type: %s", event_type)
 
     def on_event(self, event_type: str, handler: Callable):
         """Register an event handler"""
-        if event_type not in self.event_handlers:
-            self.event_handlers[event_type] = []
-        self.event_handlers[event_type].append(handler)
+        handlers = self.event_handlers.get(event_type, ()) + (handler,)
+        self.event_handlers[event_type] = handlers
+        if event_type == AUDIO_DELTA_EVENT:
+            self._audio_delta_handlers = handlers
+
+    async def _update_instructions(self, instructions: str):
+        """Send a partial session.update with new instructions, unless they are already set"""
+        if not instructions or instructions == self._current_instructions:
+            return
+
+        # The API merges partial session updates, so only the changed field is sent
+        await self.send_event("session.update", {"session": {"instructions": instructions}})
 
     async def send_text_message(self, text: str, persona_instructions: str = ""):
         """Send a text message with persona instructions"""
         # Update session with persona instructions
-        if persona_instructions:
-            await self.send_event("session.update", {
-                "session": {
-                    **self.session_config,
-                    "instructions": persona_instructions
-                }
-            })
+        await self._update_instructions(persona_instructions)
 
         # Create conversation item
-        timestamp = str(int(datetime.now().timestamp() * 1000000))
         await self.send_event("conversation.item.create", {
             "item": {
-                "id": f"msg_{timestamp}",
+                "id": f"msg_{next(self._ids):x}",
                 "type": "message",
                 "role": "user",
                 "content": [
@@ -179,22 +299,20 @@ class OpenAIRealtimeClient:
     async def send_audio_message(self, audio_data: bytes, persona_instructions: str = ""):
         """Send audio data for processing"""
         # Update session with persona instructions
-        if persona_instructions:
-            await self.send_event("session.update", {
-                "session": {
-                    **self.session_config,
-                    "instructions": persona_instructions
-                }
-            })
+        await self._update_instructions(persona_instructions)
 
-        # Encode audio data to base64
-        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        # Encode audio data to base64, off the event loop for long utterances
+        if len(audio_data) >= _OFFLOAD_ENCODE_BYTES:
+            audio_base64 = await asyncio.get_running_loop().run_in_executor(
+                None, pybase64.b64encode_as_string, audio_data
+            )
+        else:
+            audio_base64 = pybase64.b64encode_as_string(audio_data)
 
         # Create conversation item with audio
-        timestamp = str(int(datetime.now().timestamp() * 1000000))
         await self.send_event("conversation.item.create", {
             "item": {
-                "id": f"audio_{timestamp}",
+                "id": f"audio_{next(self._ids):x}",
                 "type": "message",
                 "role": "user",
                 "content": [
@@ -218,21 +336,26 @@ class OpenAIRealtimeClient:
         """Start streaming audio input"""
         await self.send_event("input_audio_buffer.clear")
 
-    async def append_audio_data(self, audio_data: bytes):
-        """Append audio data to the input buffer for continuous conversation"""
+    async def append_audio_data(self, audio_data: Union[bytes, memoryview]):
+        """Append audio data to the input buffer for continuous conversation
+
+        audio_data may be a memoryview over a caller-owned buffer; it is
+        encoded before the first await and never retained.
+        """
         try:
-            # Convert audio data to base64 for transmission
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            # Convert audio data to base64 for transmission (SIMD, straight to str)
+            audio_base64 = pybase64.b64encode_as_string(audio_data)
 
             # Send to OpenAI Realtime API
-            await self.send_event("input_audio_buffer.append", {
-                "audio": audio_base64
-            })
+            await self.send_raw_event(
+                f"{_APPEND_AUDIO_PREFIX}{next(self._ids):x}{_APPEND_AUDIO_MID}{audio_base64}{_APPEND_AUDIO_SUFFIX}"
+            )
 
-            logger.debug(f"Successfully appended {len(audio_data)} bytes of audio data")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Successfully appended %d bytes of audio data", len(audio_data))
 
         except Exception as e:
-            logger.error(f"Error appending audio data: {e}")
+            logger.error("Error appending audio data: %s", e)
             raise
 
     async def commit_audio_input(self):
@@ -246,11 +369,104 @@ class OpenAIRealtimeClient:
     def set_persona_instructions(self, instructions: str):
         """Update the persona instructions"""
         self.session_config["instructions"] = instructions
+        self.session_config_version = next(_session_config_versions)
 
     def set_voice(self, voice: str):
         """Set the voice for audio responses"""
         self.session_config["voice"] = voice
+        self.session_config_version = next(_session_config_versions)
 
     def set_temperature(self, temperature: float):
         """Set the response temperature"""
-        self.session_config["temperature"] = temperature
\ No newline at end of file
+        self.session_config["temperature"] = temperature
+        self.session_config_version = next(_session_config_versions)
+
+class RealtimeClientPool:
+    """Pool of pre-connected OpenAIRealtimeClient instances leased one per conversation"""
+
+    def __init__(self, size: int = 4, on_client_created: Optional[Callable[["OpenAIRealtimeClient"], None]] = None,
+                 acquire_timeout: float = 10.0):
+        self.size = size
+        # Called once per client, e.g. to register event handlers
+        self.on_client_created = on_client_created
+        # How long acquire() waits for a busy pool before giving up
+        self.acquire_timeout = acquire_timeout
+        self.clients: List[OpenAIRealtimeClient] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._recycling: Set[asyncio.Task] = set()
+        # Slots claimed by connects still in progress, so concurrent growth cannot overshoot size
+        self._reserved = 0
+
+    def _has_free_slot(self) -> bool:
+        """Check whether another client may be created"""
+        return len(self.clients) + self._reserved < self.size
+
+    async def _add_client(self) -> "OpenAIRealtimeClient":
+        """Create and connect a client in a reserved slot; the slot is freed on failure"""
+        self._reserved += 1
+        try:
+            client = OpenAIRealtimeClient()
+            await client.connect()
+        finally:
+            self._reserved -= 1
+        if self.on_client_created:
+            self.on_client_created(client)
+        self.clients.append(client)
+        return client
+
+    def _drop(self, client: "OpenAIRealtimeClient"):
+        """Forget a broken client so its slot can be refilled"""
+        if client in self.clients:
+            self.clients.remove(client)
+
+    async def warmup(self, count: Optional[int] = None):
+        """Connect clients until the pool holds count of them (default: size)"""
+        count = self.size if count is None else min(count, self.size)
+        while len(self.clients) + self._reserved < count:
+            self._idle.put_nowait(await self._add_client())
+        logger.info(f"Realtime client pool ready with {len(self.clients)} connections")
+
+    async def acquire(self) -> "OpenAIRealtimeClient":
+        """Lease an idle client, growing the pool on demand up to size"""
+        if self._idle.empty() and self._has_free_slot():
+            # A freshly connected client goes straight to this caller
+            return await self._add_client()
+
+        try:
+            client = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("No OpenAI realtime connection available, try again shortly") from None
+
+        if not client.is_connected:
+            try:
+                await client.connect()
+            except Exception:
+                self._drop(client)
+                raise
+        return client
+
+    def release(self, client: "OpenAIRealtimeClient"):
+        """Return a leased client; it is reconnected in the background before reuse"""
+        task = asyncio.create_task(self._recycle(client))
+        self._recycling.add(task)
+        task.add_done_callback(self._recycling.discard)
+
+    async def _recycle(self, client: "OpenAIRealtimeClient"):
+        """Give a returned client a fresh session so no conversation leaks to the next lease"""
+        try:
+            await client.disconnect()
+            await client.connect()
+        except Exception as e:
+            logger.error(f"Failed to recycle realtime client, dropping it from the pool: {e}")
+            self._drop(client)
+            return
+        self._idle.put_nowait(client)
+
+    async def close(self):
+        """Disconnect every client in the pool"""
+        for task in list(self._recycling):
+            task.cancel()
+        for client in self.clients:
+            await client.disconnect()
+        self.clients.clear()
+        self._idle = asyncio.Queue()
@@ -1,53 +1,187 @@
 from fastapi import WebSocket
-from typing import Dict, List, Optional
-import json
+from typing import Deque, Dict, Optional, Tuple, Union
+from collections import deque
+import asyncio
+import logging
+import orjson
+from services.audio_batcher import AudioBatcher
+
+logger = logging.getLogger(__name__)
+
+# Opcode of binary WebSocket frames carrying raw PCM16 audio
+AUDIO_FRAME = 0x01
+AUDIO_FRAME_PREFIX = bytes((AUDIO_FRAME,))
+
+# A client whose socket accepts nothing for this long is treated as dead
+SEND_TIMEOUT = 5.0
+
+def is_audio_frame(frame: Union[str, bytes, bytearray]) -> bool:
+    """Check whether a serialized frame is a binary audio frame"""
+    return isinstance(frame, (bytes, bytearray)) and frame[:1] == AUDIO_FRAME_PREFIX
+
+class ClientOutbox:
+    """Bounded queue of frames waiting to be sent to one client"""
+
+    def __init__(self, maxsize: int = 16, max_audio_bytes: int = 65536):
+        self.maxsize = maxsize
+        # Caps queued PCM (~1.3 s of 24 kHz PCM16) so a slow client hears
+        # the newest audio late by a bounded amount rather than ever later
+        self.max_audio_bytes = max_audio_bytes
+        self.audio_bytes = 0
+        self.frames: Deque[Union[str, bytes, bytearray]] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, frame: Union[str, bytes]) -> bool:
+        """Queue a frame, returning False if it had to be dropped"""
+        if not is_audio_frame(frame):
+            # Control frames are small and rare, so they are never dropped
+            self.frames.append(frame)
+            self._ready.set()
+            return True
+
+        if len(self.frames) >= self.maxsize:
+            # Keep backpressure on slow clients: merge audio into the last
+            # queued audio frame instead of growing the queue
+            last = self.frames[-1]
+            if not is_audio_frame(last):
+                return False
+            if isinstance(last, bytes):
+                # Grown in place from now on, so repeated merges do not recopy it
+                last = self.frames[-1] = bytearray(last)
+            last.extend(memoryview(frame)[1:])
+        else:
+            self.frames.append(frame)
+            self._ready.set()
+
+        self.audio_bytes += len(frame) - 1
+        self._trim_audio()
+        return True
+
+    def _trim_audio(self):
+        """Drop the oldest queued audio until it fits in max_audio_bytes"""
+        while self.audio_bytes > self.max_audio_bytes:
+            index = next(i for i, queued in enumerate(self.frames) if is_audio_frame(queued))
+            oldest = self.frames[index]
+            payload = len(oldest) - 1
+            # Whole PCM16 samples only
+            excess = self.audio_bytes - self.max_audio_bytes
+            excess += excess & 1
+            if payload <= excess:
+                del self.frames[index]
+                self.audio_bytes -= payload
+                continue
+
+            # Cut the stale start off a partially stale frame
+            if isinstance(oldest, bytes):
+                oldest = self.frames[index] = bytearray(oldest)
+            del oldest[1:1 + excess]
+            self.audio_bytes -= excess
+
+    async def get(self) -> Union[str, bytes]:
+        """Wait for and remove the oldest queued frame"""
+        while not self.frames:
+            self._ready.clear()
+            await self._ready.wait()
+        frame = self.frames.popleft()
+        if is_audio_frame(frame):
+            self.audio_bytes -= len(frame) - 1
+            if isinstance(frame, bytearray):
+                frame = bytes(frame)
+        return frame
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.client_personas: Dict[str, str] = {}
+        self.audio_batchers: Dict[str, AudioBatcher] = {}
+        # Outgoing frames are queued per client and written by a sender task,
+        # so a slow client never stalls the OpenAI event loop
+        self.outboxes: Dict[str, ClientOutbox] = {}
+        self.sender_tasks: Dict[str, asyncio.Task] = {}
+        # Immutable snapshot rebuilt only on connect/disconnect, so stats polling
+        # and broadcasts never walk (or race with changes to) the dict
+        self._connected_clients: Tuple[str, ...] = ()
 
     async def connect(self, websocket: WebSocket, client_id: str):
         """Accept a new WebSocket connection"""
         await websocket.accept()
         self.active_connections[client_id] = websocket
-        print(f"Client {client_id} connected")
+        self._connected_clients = tuple(self.active_connections)
+        self.outboxes[client_id] = ClientOutbox()
+        self.sender_tasks[client_id] = asyncio.create_task(
+            self._send_queued_frames(client_id, websocket, self.outboxes[client_id])
+        )
+        logger.info("Client %s connected", client_id)
 
     def disconnect(self, client_id: str):
         """Remove a client connection"""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
-        if client_id in self.client_personas:
-            del self.client_personas[client_id]
-        print(f"Client {client_id} disconnected")
-
-    async def send_message(self, client_id: str, message: dict):
-        """Send a message to a specific client"""
-        if client_id in self.active_connections:
+        if self.active_connections.pop(client_id, None) is not None:
+            self._connected_clients = tuple(self.active_connections)
+        self.client_personas.pop(client_id, None)
+        batcher = self.audio_batchers.pop(client_id, None)
+        if batcher:
+            batcher.close()
+        self.outboxes.pop(client_id, None)
+        sender_task = self.sender_tasks.pop(client_id, None)
+        if sender_task and sender_task is not asyncio.current_task():
+            sender_task.cancel()
+        logger.info("Client %s disconnected", client_id)
+
+    async def send_message(self, client_id: str, message: Union[dict, bytes]):
+        """Send a message to a specific client (bytes go out as a binary frame)"""
+        await self.send_raw(client_id, self._encode(message))
+
+    async def send_raw(self, client_id: str, frame: Union[str, bytes]):
+        """Queue an already serialized frame (text for str, binary for bytes) for a client"""
+        self._enqueue(client_id, frame)
+
+    def _enqueue(self, client_id: str, frame: Union[str, bytes]):
+        """Put a frame in a client's outbox; never blocks, the sender task does the I/O"""
+        outbox = self.outboxes.get(client_id)
+        if outbox and not outbox.put(frame):
+            logger.warning("Dropped audio frame for slow client %s", client_id)
+
+    async def _send_queued_frames(self, client_id: str, websocket: WebSocket, outbox: ClientOutbox):
+        """Write a client's queued frames to its socket until it disconnects"""
+        while True:
+            frame = await outbox.get()
             try:
-                websocket = self.active_connections[client_id]
-                await websocket.send_text(json.dumps(message))
+                if isinstance(frame, str):
+                    await asyncio.wait_for(websocket.send_text(frame), SEND_TIMEOUT)
+                else:
+                    await asyncio.wait_for(websocket.send_bytes(frame), SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out sending to %s, disconnecting", client_id)
+                self.disconnect(client_id)
+                # Closing ends the endpoint's receive loop, so its normal teardown
+                # (upload drain, OpenAI lease release) still runs
+                try:
+                    await asyncio.wait_for(websocket.close(code=1011), SEND_TIMEOUT)
+                except Exception as e:
+                    logger.debug("Ignoring error while closing stalled socket for %s: %s", client_id, e)
+                return
             except Exception as e:
-                print(f"Error sending message to {client_id}: {e}")
+                logger.error("Error sending message to %s: %s", client_id, e)
                 self.disconnect(client_id)
+                return
 
-    async def broadcast(self, message: dict, exclude_client: Optional[str] = None):
+    async def broadcast(self, message: Union[dict, bytes], exclude_client: Optional[str] = None):
         """Broadcast a message to all connected clients"""
-        disconnected_clients = []
+        payload = self._encode(message)
 
-        for client_id, websocket in self.active_connections.items():
+        # Enqueueing cannot block, so there is nothing to gather; each client's
+        # sender task writes concurrently and disconnects it if the send fails
+        for client_id in self._connected_clients:
             if exclude_client and client_id == exclude_client:
                 continue
+            self._enqueue(client_id, payload)
 
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                print(f"Error broadcasting to {client_id}: {e}")
-                disconnected_clients.append(client_id)
-
-        # Clean up disconnected clients
-        for client_id in disconnected_clients:
-            self.disconnect(client_id)
+    @staticmethod
+    def _encode(message: Union[dict, bytes]) -> Union[str, bytes]:
+        """Serialize a control message to JSON text; binary payloads pass through"""
+        if isinstance(message, (bytes, bytearray)):
+            return bytes(message)
+        return orjson.dumps(message).decode()
 
     def set_client_persona(self, client_id: str, persona_id: str):
         """Set the persona for a specific client"""
@@ -57,9 +191,17 @@ class ConnectionManager:
         """Get the current persona for a client"""
         return self.client_personas.get(client_id)
 
-    def get_connected_clients(self) -> List[str]:
-        """Get list of all connected client IDs"""
-        return list(self.active_connections.keys())
+    def set_audio_batcher(self, client_id: str, batcher: AudioBatcher):
+        """Set the batcher that coalesces a client's outgoing audio"""
+        self.audio_batchers[client_id] = batcher
+
+    def get_audio_batcher(self, client_id: str) -> Optional[AudioBatcher]:
+        """Get the audio batcher for a client"""
+        return self.audio_batchers.get(client_id)
+
+    def get_connected_clients(self) -> Tuple[str, ...]:
+        """Get all connected client IDs as a shared snapshot"""
+        return self._connected_clients
 
     def get_connection_count(self) -> int:
         """Get the number of active connections"""